@@ -0,0 +1,327 @@
+"""
+Storage and domain logic behind the sensor routes.
+
+Everything here is plain, fully typed Python with no FastAPI dependency, so
+it can be unit-tested directly and compiled with mypyc when interpreter
+overhead on the ingest path starts to matter.
+"""
+
+import bisect
+import time
+from array import array
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from operator import attrgetter
+from typing import Final, Protocol
+from zoneinfo import ZoneInfo
+
+from sortedcontainers import SortedDict
+
+from app.core.config import config
+from app.exceptions import InvalidTimestampError
+from app.schemas import (
+    SENSOR_RECORD_ADAPTER,
+    Classification,
+    HealthStatus,
+    SensorDataRecord,
+    SensorReadings,
+)
+
+# Only needed to word the future-timestamp error, so the zone (and its tzdata)
+# is loaded on the first rejected reading rather than at import. A fixed
+# offset would be cheaper still, but wrong for half the year because of DST.
+ISRAEL_TZ_NAME = "Asia/Jerusalem"
+
+# Seconds a reading may be ahead of the server clock before it's rejected
+CLOCK_SKEW_TOLERANCE = 1.0
+
+HEALTHY: Final = "Healthy"
+NEEDS_ATTENTION: Final = "Needs Attention"
+
+READINGS_RETENTION = config.READINGS_RETENTION
+
+# Compact codes for storing classifications in an unsigned byte array
+CLASSIFICATION_CODES: dict[Classification, int] = {HEALTHY: 0, NEEDS_ATTENTION: 1}
+
+
+@dataclass
+class ReadingsBuffer:
+    """
+    Ring buffer of a unit's reading history, stored column by column.
+
+    A SensorDataRecord per reading costs hundreds of bytes in object headers
+    and per-instance dicts. Packing each field into its own typed array keeps
+    a reading to 33 bytes. The arrays grow as readings arrive and stop at
+    `capacity`, after which each new reading overwrites the oldest one.
+    """
+
+    capacity: int = READINGS_RETENTION
+    timestamps: array[float] = field(default_factory=lambda: array("d"))  # epoch
+    ph: array[float] = field(default_factory=lambda: array("d"))
+    temp: array[float] = field(default_factory=lambda: array("d"))
+    ec: array[float] = field(default_factory=lambda: array("d"))
+    classifications: array[int] = field(default_factory=lambda: array("B"))
+    cursor: int = 0  # next slot to overwrite once full
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def append(self, record: SensorDataRecord) -> None:
+        """
+        Store a reading, overwriting the oldest one if the buffer is full.
+
+        Args:
+            record: The classified reading to store.
+        """
+        timestamp = record.timestamp.timestamp()
+        readings = record.readings
+        classification = CLASSIFICATION_CODES[record.classification]
+
+        if len(self) < self.capacity:
+            self.timestamps.append(timestamp)
+            self.ph.append(readings.pH)
+            self.temp.append(readings.temp)
+            self.ec.append(readings.ec)
+            self.classifications.append(classification)
+        else:
+            slot = self.cursor
+            self.timestamps[slot] = timestamp
+            self.ph[slot] = readings.pH
+            self.temp[slot] = readings.temp
+            self.ec[slot] = readings.ec
+            self.classifications[slot] = classification
+            self.cursor = (slot + 1) % self.capacity
+
+
+# In-memory storage for sensor readings
+# Structure: {unit_id: ReadingsBuffer}
+SENSOR_READINGS_STORE: defaultdict[str, ReadingsBuffer] = defaultdict(ReadingsBuffer)
+
+# Why 10? Hydroponic systems typically cycle nutrients every 2-3 hours.
+# Ten alerts give growers ~20-30 hours of problem history - enough to spot
+# patterns without overwhelming them.
+MAX_ALERTS = 10
+
+
+class Timestamped(Protocol):
+    @property
+    def timestamp(self) -> datetime: ...
+
+
+@dataclass(frozen=True, slots=True)
+class SerializedAlert:
+    """
+    An alert reading rendered to JSON once, when it was ingested.
+
+    Alerts never change after classification, yet /alerts is polled far more
+    often than any one unit raises them. Keeping the JSON next to the
+    timestamp lets /alerts stitch its response together from these bytes
+    instead of serializing the same records on every request.
+    """
+
+    timestamp: datetime
+    body: bytes  # SensorDataRecord dumped with field aliases
+
+
+# Most recent 'Needs Attention' readings per unit, kept at ingest time so
+# /alerts never has to scan a unit's full history
+# Structure: {unit_id: deque of SerializedAlert, oldest first}
+ALERTS_STORE: defaultdict[str, deque[SerializedAlert]] = defaultdict(
+    lambda: deque(maxlen=MAX_ALERTS)
+)
+
+# Health status is based on alerts in the last 10 readings
+MAX_RECENT_READINGS = 10
+
+
+@dataclass
+class UnitStats:
+    """
+    Running aggregates for one unit, updated on every ingested reading.
+
+    Keeping these at write time means /units only reads a handful of numbers
+    per unit instead of re-scanning and sorting every reading it has.
+    """
+
+    total_readings: int = 0
+    alerts_count: int = 0
+    last_reading: SensorDataRecord | None = None
+    recent_readings: deque[SensorDataRecord] = field(
+        default_factory=lambda: deque(maxlen=MAX_RECENT_READINGS)
+    )
+    health_status: HealthStatus | None = None
+    # The unit's UnitStatus as /units renders it, kept until the next reading
+    # changes any of the numbers above
+    status_json: bytes | None = None
+
+
+# Structure: {unit_id: UnitStats}
+UNIT_STATS: defaultdict[str, UnitStats] = defaultdict(UnitStats)
+
+# Units grouped by health status, most urgent first, each sorted by unit_id.
+# A unit moves between buckets on ingest, so /units can list them in display
+# order without sorting.
+# Structure: {health_status: SortedDict of unit_id -> UnitStats}
+HEALTH_BUCKETS: dict[HealthStatus, SortedDict] = {
+    "critical": SortedDict(),
+    "warning": SortedDict(),
+    "healthy": SortedDict(),
+}
+
+
+def clear_stores() -> None:
+    """
+    Remove every stored reading, alert, and unit aggregate.
+    """
+    SENSOR_READINGS_STORE.clear()
+    ALERTS_STORE.clear()
+    UNIT_STATS.clear()
+    for bucket in HEALTH_BUCKETS.values():
+        bucket.clear()
+
+
+def insert_by_timestamp[T: Timestamped](window: deque[T], record: T) -> None:
+    """
+    Insert a record into a bounded window kept in ascending timestamp order.
+
+    Sensors can deliver readings out of order (network delays, buffering), so
+    we can't just append: the record is slotted in by timestamp, and once the
+    window is full the oldest reading drops out. A record older than
+    everything in a full window is ignored.
+
+    Records with equal timestamps are stored newest arrival first, because
+    `insort_left` places a record before its equals. Reading the window
+    backwards therefore yields them in arrival order, and a full window
+    evicts the latest arrival among the oldest. Both match a stable
+    newest-first sort, which is the order /alerts has always returned, so
+    this must not become `insort_right`.
+
+    Args:
+        window: Deque with a maxlen, ordered oldest to newest.
+        record: The reading to insert.
+    """
+    if len(window) == window.maxlen:
+        if record.timestamp <= window[0].timestamp:
+            return
+        window.popleft()
+    bisect.insort_left(window, record, key=attrgetter("timestamp"))
+
+
+def get_health_status(recent_alerts: int) -> HealthStatus:
+    """
+    Map the number of alerts in a unit's recent readings to a health status.
+
+    Args:
+        recent_alerts: 'Needs Attention' readings among the last 10 readings.
+
+    Returns:
+        'healthy' for no alerts, 'warning' for 1-3, 'critical' for 4 or more.
+    """
+    if recent_alerts == 0:
+        return "healthy"
+    elif recent_alerts <= 3:
+        return "warning"
+    return "critical"
+
+
+def update_unit_stats(stats: UnitStats, record: SensorDataRecord) -> None:
+    """
+    Fold a newly ingested reading into a unit's running aggregates and move
+    the unit to its new health bucket if its status changed.
+
+    Args:
+        stats: The unit's aggregates to update in place.
+        record: The classified reading that was just stored.
+    """
+    stats.status_json = None
+    stats.total_readings += 1
+    if record.classification == NEEDS_ATTENTION:
+        stats.alerts_count += 1
+    # Strictly newer only, so the first of several equal timestamps wins
+    if stats.last_reading is None or record.timestamp > stats.last_reading.timestamp:
+        stats.last_reading = record
+    insert_by_timestamp(stats.recent_readings, record)
+
+    health_status = get_health_status(
+        sum(
+            reading.classification == NEEDS_ATTENTION
+            for reading in stats.recent_readings
+        )
+    )
+    if health_status != stats.health_status:
+        if stats.health_status is not None:
+            del HEALTH_BUCKETS[stats.health_status][record.unit_id]
+        HEALTH_BUCKETS[health_status][record.unit_id] = stats
+        stats.health_status = health_status
+
+
+def store_reading(record: SensorDataRecord) -> None:
+    """
+    Record a classified reading in every in-memory store.
+
+    This must stay synchronous. With no `await` in it, the event loop runs
+    every update for a reading to completion before any other request sees
+    the stores, so they never need locking. Per-unit locks would not be
+    enough anyway, because HEALTH_BUCKETS is shared by all units.
+
+    Args:
+        record: The validated, classified reading to store.
+    """
+    SENSOR_READINGS_STORE[record.unit_id].append(record)
+    if record.classification == NEEDS_ATTENTION:
+        alert = SerializedAlert(
+            record.timestamp, SENSOR_RECORD_ADAPTER.dump_json(record, by_alias=True)
+        )
+        insert_by_timestamp(ALERTS_STORE[record.unit_id], alert)
+    update_unit_stats(UNIT_STATS[record.unit_id], record)
+
+
+def validate_timestamp(timestamp: datetime, now: float | None = None) -> None:
+    """
+    Validate timestamp is not in the future.
+
+    Future timestamps indicate clock sync issues on sensor devices
+    and can corrupt trend analysis by appearing out of sequence. We allow
+    `CLOCK_SKEW_TOLERANCE` seconds of drift so a device that is a hair ahead
+    of the server isn't rejected.
+
+    The check runs on every submitted reading, so it compares epoch seconds
+    instead of aware datetimes, which would resolve both UTC offsets each time.
+
+    Args:
+        timestamp: The datetime to validate.
+        now: Current time in epoch seconds. Callers validating several
+            readings at once can read the clock once and pass it in; defaults
+            to `time.time()`.
+
+    Raises:
+        InvalidTimestampError: When timestamp is in the future.
+    """
+    if now is None:
+        now = time.time()
+    if timestamp.timestamp() > now + CLOCK_SKEW_TOLERANCE:
+        israel_now = datetime.fromtimestamp(now, ZoneInfo(ISRAEL_TZ_NAME))
+        raise InvalidTimestampError(
+            timestamp.isoformat(),
+            f"Timestamp cannot be in the future (current time in Israel: {israel_now.isoformat()})",
+        )
+
+
+def classify_reading(readings: SensorReadings) -> Classification:
+    """
+    Classify sensor readings based on pH levels.
+
+    We only use pH for classification because it's the most critical factor
+    for plant health in hydroponics. Temperature and EC affect growth rates
+    but pH directly impacts nutrient availability. The 5.5-7.0 range was chosen
+    because outside this range, essential nutrients become chemically unavailable to plants regardless of their concentration in the solution.
+
+    Args:
+        readings: Sensor readings with pH, temp, and ec values.
+
+    Returns:
+        Classification string: either "Healthy" or "Needs Attention".
+    """
+    ph_value = readings.pH
+    return NEEDS_ATTENTION if ph_value < 5.5 or ph_value > 7.0 else HEALTHY
@@ -2,7 +2,7 @@ import functools
 from pathlib import Path
 from typing import Annotated, Any
 
-from pydantic import AnyUrl, BeforeValidator, computed_field
+from pydantic import AnyUrl, BeforeValidator, PositiveInt, computed_field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 BASE_DIR = Path(__file__).resolve().parents[2]
@@ -30,8 +30,13 @@ class Settings(BaseSettings):
         list[AnyUrl] | str, BeforeValidator(parse_cors)
     ] = []
 
+    # Readings kept per unit; once a unit reaches this many, the oldest are
+    # overwritten so memory stays bounded at units x retention. Must be
+    # positive, so a bad value fails at startup instead of on every POST.
+    READINGS_RETENTION: PositiveInt = 10_000
+
     @computed_field
-    @property
+    @functools.cached_property
     def all_cors_origins(self) -> list[str]:
         return [str(origin).rstrip("/") for origin in self.BACKEND_CORS_ORIGINS] + [
             self.FRONTEND_HOST
@@ -2,12 +2,16 @@
 Custom exceptions for the HydroSense Monitor API.
 
 Each exception maps to a specific HTTP status code and includes context about why the error occurred.
+
+They're plain exceptions rather than FastAPI HTTPExceptions, so the domain
+code that raises them doesn't depend on FastAPI. The app renders them with
+`hydrosense_error_handler`.
 """
 
-from fastapi import HTTPException, status
+from http import HTTPStatus
 
 
-class HydroSenseError(HTTPException):
+class HydroSenseError(Exception):
     """
     Base exception for all HydroSense-specific errors.
     """
@@ -18,22 +22,10 @@ class HydroSenseError(HTTPException):
         detail: str,
         headers: dict[str, str] | None = None,
     ):
-        super().__init__(status_code=status_code, detail=detail, headers=headers)
-
-
-class InvalidSensorReadingsError(HydroSenseError):
-    """
-    Raised when sensor readings are outside physical limits.
-
-    This typically happens when malfunctioning sensors report impossible values
-    like negative pH or temperatures below absolute zero. Early detection prevents bad data from corrupting our analytics.
-    """
-
-    def __init__(self, detail: str = "Sensor readings contain invalid values"):
-        super().__init__(
-            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-            detail=detail,
-        )
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.headers = headers
 
 
 class InvalidTimestampError(HydroSenseError):
@@ -48,6 +40,6 @@ class InvalidTimestampError(HydroSenseError):
         self, timestamp: str, reason: str = "Timestamp cannot be in the future"
     ):
         super().__init__(
-            status_code=status.HTTP_400_BAD_REQUEST,
+            status_code=HTTPStatus.BAD_REQUEST,
             detail=f"Invalid timestamp '{timestamp}': {reason}",
         )
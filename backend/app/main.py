@@ -1,11 +1,17 @@
-from collections.abc import AsyncGenerator
+import copy
+from collections.abc import AsyncGenerator, Callable
 from contextlib import asynccontextmanager
+from typing import Any
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from app.api.main import api_router
 from app.core.config import config
+from app.exceptions import HydroSenseError
 
 
 @asynccontextmanager
@@ -15,6 +21,95 @@ async def lifespan(_application: FastAPI) -> AsyncGenerator:
     # Shutdown
 
 
+class UnhandledErrorMiddleware:
+    """
+    Turn an unexpected exception into a JSON 500 inside the CORS layer.
+
+    An exception handler for `Exception` runs in Starlette's outermost
+    middleware, outside CORSMiddleware, so its 500 carries no
+    Access-Control-Allow-Origin header and a cross-origin frontend can't
+    read it. Added first, this middleware sits innermost instead.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        response_started = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            if response_started:
+                raise
+            # Sensor data is critical - we'd rather return a 500 error than
+            # silently fail and leave growers without feedback. Handling it
+            # once here keeps try/except out of the request path; re-raising
+            # after the response is sent still gets the exception logged.
+            response = JSONResponse(
+                {"detail": "An unexpected error occurred while processing the request"},
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+            await response(scope, receive, send)
+            raise
+
+
+async def hydrosense_error_handler(
+    _request: Request, exc: HydroSenseError
+) -> JSONResponse:
+    # Rendered the way FastAPI renders an HTTPException
+    return JSONResponse(
+        {"detail": exc.detail}, status_code=exc.status_code, headers=exc.headers
+    )
+
+
+def hoist_request_body_defs(
+    openapi: Callable[[], dict[str, Any]],
+) -> Callable[[], dict[str, Any]]:
+    """
+    Move the `$defs` of hand-written request bodies into the OpenAPI
+    components.
+
+    Routes that parse their own body describe it in `openapi_extra` with a
+    schema whose refs point at `#/components/schemas/`, but the models they
+    name are only embedded in the schema's own `$defs`. Lifting them into the
+    components makes those refs resolve.
+
+    Args:
+        openapi: The application's original `openapi` method.
+
+    Returns:
+        An `openapi` method that returns the fixed-up schema.
+    """
+
+    def wrapper() -> dict[str, Any]:
+        schema = openapi()
+        components = schema.setdefault("components", {}).setdefault("schemas", {})
+        for path_item in schema.get("paths", {}).values():
+            for operation in path_item.values():
+                if "requestBody" not in operation:
+                    continue
+                # FastAPI merges `openapi_extra` in by reference, so copy
+                # before editing to leave the route's own description intact
+                request_body = copy.deepcopy(operation["requestBody"])
+                for media_type in request_body.get("content", {}).values():
+                    components.update(media_type.get("schema", {}).pop("$defs", {}))
+                operation["requestBody"] = request_body
+        return schema
+
+    return wrapper
+
+
 def get_application() -> FastAPI:
     application = FastAPI(
         title=config.PROJECT_NAME,
@@ -24,6 +119,16 @@ def get_application() -> FastAPI:
         lifespan=lifespan,
     )
 
+    application.add_exception_handler(HydroSenseError, hydrosense_error_handler)
+
+    # Middleware added later wraps what came before, so this one ends up
+    # innermost, where its 500s still pass through CORS and GZip
+    application.add_middleware(UnhandledErrorMiddleware)
+
+    # /units and /alerts return lists that grow with the number of units and
+    # alerts; small bodies aren't worth compressing
+    application.add_middleware(GZipMiddleware, minimum_size=500)
+
     # Set all CORS enabled origins
     if config.all_cors_origins:
         application.add_middleware(
@@ -35,6 +140,7 @@ def get_application() -> FastAPI:
         )
 
     application.include_router(api_router, prefix=config.API_V1_STR)
+    application.openapi = hoist_request_body_defs(application.openapi)
     return application
 
 
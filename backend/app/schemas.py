@@ -1,19 +1,44 @@
 from datetime import datetime
-from typing import Annotated
+from typing import Annotated, Literal
 
-from pydantic import BaseModel, ConfigDict, Field, field_serializer, field_validator
+from pydantic import (
+    AfterValidator,
+    AwareDatetime,
+    BaseModel,
+    ConfigDict,
+    Field,
+    TypeAdapter,
+)
+
+# Literals let pydantic-core check these with a string comparison, and give
+# type checkers the full set of values
+type Classification = Literal["Healthy", "Needs Attention"]
+type HealthStatus = Literal["healthy", "warning", "critical"]
+
+
+def strip_unit_id(unit_id: str) -> str:
+    unit_id = unit_id.strip()
+    if not unit_id:
+        raise ValueError("unit_id cannot be empty or whitespace")
+    return unit_id
 
 
 class SensorReadings(BaseModel):
     """
     Sensor readings containing pH, temperature, and electrical conductivity.
+
+    The bounds are physical limits for a hydroponic system, so readings
+    outside them come from a malfunctioning sensor. They're enforced here so
+    pydantic-core rejects them while parsing the request body.
     """
 
     pH: Annotated[
         float,
         Field(ge=0, le=14, description="pH level (0-14)"),
     ]
-    temp: Annotated[float, Field(ge=-50, le=100, description="Temperature in Celsius")]
+    temp: Annotated[
+        float, Field(ge=-10, le=60, description="Temperature in Celsius (-10 to 60)")
+    ]
     ec: Annotated[
         float, Field(ge=0, le=10, description="Electrical conductivity in mS/cm")
     ]
@@ -31,28 +56,47 @@ class SensorDataInput(BaseModel):
             description="Unique identifier for the hydroponic unit",
             alias="unitId",
         ),
+        AfterValidator(strip_unit_id),
     ]
+    # A timestamp without an offset can't be placed on the timeline, and
+    # readings are ordered by it, so it's rejected rather than guessed at
     timestamp: Annotated[
-        datetime, Field(description="ISO 8601 timestamp of the reading")
+        AwareDatetime,
+        Field(description="ISO 8601 timestamp of the reading, with a UTC offset"),
     ]
     readings: SensorReadings
 
-    @field_validator("unit_id")
-    @classmethod
-    def validate_unit_id(cls, v: str) -> str:
-        if not v.strip():
-            raise ValueError("unit_id cannot be empty or whitespace")
-        return v.strip()
-
 
 class ClassificationStatus(BaseModel):
     """
     Response model for sensor data classification.
     """
 
-    status: Annotated[str, Field(default="OK", description="Request processing status")]
+    status: Annotated[
+        Literal["OK"], Field(default="OK", description="Request processing status")
+    ]
     classification: Annotated[
-        str, Field(description="Health classification: 'Healthy' or 'Needs Attention'")
+        Classification,
+        Field(description="Health classification: 'Healthy' or 'Needs Attention'"),
+    ]
+
+
+# Largest batch accepted by POST /sensor/batch, so one request can't hold the
+# event loop for long while it's validated and stored
+MAX_BATCH_SIZE = 1000
+
+
+class BatchClassificationStatus(BaseModel):
+    """
+    Response model for batch sensor data submission.
+    """
+
+    status: Annotated[
+        Literal["OK"], Field(default="OK", description="Request processing status")
+    ]
+    classifications: Annotated[
+        list[Classification],
+        Field(description="Health classification of each reading, in request order"),
     ]
 
 
@@ -64,11 +108,7 @@ class SensorDataRecord(BaseModel):
     unit_id: str = Field(..., alias="unitId")
     timestamp: datetime
     readings: SensorReadings
-    classification: str
-
-    @field_serializer("timestamp")
-    def serialize_timestamp(self, timestamp: datetime) -> str:
-        return timestamp.isoformat()
+    classification: Classification
 
     model_config = ConfigDict(populate_by_name=True)
 
@@ -105,7 +145,7 @@ class UnitStatus(BaseModel):
     alerts_count: int = Field(
         ..., alias="alertsCount", description="Number of 'Needs Attention' readings"
     )
-    health_status: str = Field(
+    health_status: HealthStatus = Field(
         ...,
         alias="healthStatus",
         description="Overall health: 'healthy', 'warning', or 'critical'",
@@ -119,3 +159,15 @@ class UnitsResponse(BaseModel):
 
     units: list[UnitStatus]
     total_units: int = Field(..., alias="totalUnits")
+
+
+# Adapters are built once, at import, so their validators and serializers are
+# compiled before the first request and reused by every one after it
+SENSOR_INPUT_ADAPTER = TypeAdapter(SensorDataInput)
+SENSOR_BATCH_ADAPTER = TypeAdapter(
+    Annotated[list[SensorDataInput], Field(min_length=1, max_length=MAX_BATCH_SIZE)]
+)
+SENSOR_RECORD_ADAPTER = TypeAdapter(SensorDataRecord)
+CLASSIFICATION_STATUS_ADAPTER = TypeAdapter(ClassificationStatus)
+BATCH_CLASSIFICATION_STATUS_ADAPTER = TypeAdapter(BatchClassificationStatus)
+UNIT_STATUS_ADAPTER = TypeAdapter(UnitStatus)
@@ -1,23 +1,48 @@
+import asyncio
+
 import pytest
 from httpx import ASGITransport, AsyncClient
 
-from app.api.routes.sensor import SENSOR_READINGS_STORE
-from app.main import app
+from app.api.routes.sensor_core import clear_stores
+
+# Run the tests on uvloop, the loop the app itself is served with.
+# pytest-asyncio builds its loops from the current policy, so setting it here
+# works without overriding its (deprecated) event_loop_policy fixture.
+# uvloop isn't available on Windows or PyPy, where the app falls back to
+# asyncio's own loop, and so do the tests.
+try:
+    import uvloop
+except ImportError:
+    pass
+else:
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
 
 
 @pytest.fixture(autouse=True)
 def clear_store():
     """
-    Clear the sensor readings store before each test.
+    Clear the sensor readings, alerts, and unit stats stores before each test.
     """
-    SENSOR_READINGS_STORE.clear()
+    clear_stores()
     yield
-    SENSOR_READINGS_STORE.clear()
+    clear_stores()
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 async def client():
+    """
+    One client for the whole test run. Building the ASGI transport and httpx
+    client per test costs more than the short tests themselves, and
+    `clear_store` still resets the data between tests.
+
+    The app is imported here rather than at the top of the module, so unit
+    tests that never ask for a client don't pay for importing FastAPI.
+    """
+    from app.main import app
+
+    # Requests never leave the process, so don't read proxy or netrc settings
+    # from the environment
     async with AsyncClient(
-        transport=ASGITransport(app=app), base_url="http://test"
+        transport=ASGITransport(app=app), base_url="http://test", trust_env=False
     ) as client:
         yield client
@@ -0,0 +1,28 @@
+import subprocess
+import sys
+
+import pytest
+
+
+@pytest.mark.parametrize(
+    "module",
+    [
+        # sensor_core is documented as having no FastAPI dependency
+        "app.api.routes.sensor_core",
+        # unit tests that never ask for a client shouldn't pay for FastAPI
+        "app.tests.conftest",
+    ],
+)
+def test_module_does_not_import_fastapi(module):
+    """
+    A fresh interpreter is used because this one has usually imported the
+    app already.
+    """
+    subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            f"import sys, {module}; assert 'fastapi' not in sys.modules",
+        ],
+        check=True,
+    )
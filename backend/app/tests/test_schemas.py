@@ -1,9 +1,9 @@
-from datetime import datetime
+from datetime import UTC, datetime
 
 import pytest
 from pydantic import ValidationError
 
-from app.schemas import SensorDataInput, SensorReadings
+from app.schemas import SENSOR_INPUT_ADAPTER, SensorDataInput, SensorReadings
 
 
 def test_valid_sensor_readings():
@@ -33,20 +33,20 @@ def test_ph_range_validation():
 
 def test_temperature_range_validation():
     """
-    Temperature must be between -50 and 100.
+    Temperature must be between -10 and 60.
     """
     # valid edge cases
-    SensorReadings(pH=6.5, temp=-50, ec=1.0)
-    SensorReadings(pH=6.5, temp=100, ec=1.0)
+    SensorReadings(pH=6.5, temp=-10, ec=1.0)
+    SensorReadings(pH=6.5, temp=60, ec=1.0)
 
     # invalid cases
     with pytest.raises(ValidationError) as exc_info:
-        SensorReadings(pH=6.5, temp=-51, ec=1.0)
-    assert "greater than or equal to -50" in str(exc_info.value)
+        SensorReadings(pH=6.5, temp=-11, ec=1.0)
+    assert "greater than or equal to -10" in str(exc_info.value)
 
     with pytest.raises(ValidationError) as exc_info:
-        SensorReadings(pH=6.5, temp=101, ec=1.0)
-    assert "less than or equal to 100" in str(exc_info.value)
+        SensorReadings(pH=6.5, temp=61, ec=1.0)
+    assert "less than or equal to 60" in str(exc_info.value)
 
 
 def test_ec_range_validation():
@@ -70,11 +70,11 @@ def test_ec_range_validation():
 def test_valid_sensor_data_input():
     data = SensorDataInput(
         unitId="unit-123",
-        timestamp=datetime(2025, 5, 24, 12, 34, 56),
+        timestamp=datetime(2025, 5, 24, 12, 34, 56, tzinfo=UTC),
         readings=SensorReadings(pH=6.5, temp=22.1, ec=1.2),
     )
     assert data.unit_id == "unit-123"
-    assert data.timestamp == datetime(2025, 5, 24, 12, 34, 56)
+    assert data.timestamp == datetime(2025, 5, 24, 12, 34, 56, tzinfo=UTC)
     assert data.readings.pH == 6.5
 
 
@@ -85,7 +85,7 @@ def test_unit_id_validation():
     # valid cases - whitespace should be trimmed
     data = SensorDataInput(
         unitId="  unit-123  ",
-        timestamp=datetime.now(),
+        timestamp=datetime.now(UTC),
         readings=SensorReadings(pH=6.5, temp=22, ec=1.0),
     )
     assert data.unit_id == "unit-123"
@@ -94,7 +94,7 @@ def test_unit_id_validation():
     with pytest.raises(ValidationError) as exc_info:
         SensorDataInput(
             unitId="",
-            timestamp=datetime.now(),
+            timestamp=datetime.now(UTC),
             readings=SensorReadings(pH=6.5, temp=22, ec=1.0),
         )
     assert "String should have at least 1 character" in str(exc_info.value)
@@ -102,15 +102,25 @@ def test_unit_id_validation():
     with pytest.raises(ValidationError) as exc_info:
         SensorDataInput(
             unitId="   ",
-            timestamp=datetime.now(),
+            timestamp=datetime.now(UTC),
             readings=SensorReadings(pH=6.5, temp=22, ec=1.0),
         )
     assert "unit_id cannot be empty or whitespace" in str(exc_info.value)
 
 
+def test_naive_timestamp_rejected():
+    with pytest.raises(ValidationError) as exc_info:
+        SensorDataInput(
+            unitId="unit-123",
+            timestamp=datetime(2025, 5, 24, 12, 34, 56),
+            readings=SensorReadings(pH=6.5, temp=22, ec=1.0),
+        )
+    assert "Input should have timezone info" in str(exc_info.value)
+
+
 def test_missing_required_fields():
     with pytest.raises(ValidationError) as exc_info:
-        SensorDataInput(unitId="unit-123", timestamp=datetime.now())
+        SensorDataInput(unitId="unit-123", timestamp=datetime.now(UTC))
     assert "readings" in str(exc_info.value)
     assert "Field required" in str(exc_info.value)
 
@@ -120,3 +130,54 @@ def test_missing_required_fields():
         )
     assert "timestamp" in str(exc_info.value)
     assert "Field required" in str(exc_info.value)
+
+
+def test_extra_fields_ignored():
+    """
+    Sensors sending fields we don't know about are still accepted; the
+    extras are dropped.
+    """
+    data = SENSOR_INPUT_ADAPTER.validate_json(
+        b'{"unitId": "test", "timestamp": "2025-05-24T10:00:00Z", '
+        b'"readings": {"pH": 6.5, "temp": 22.1, "ec": 1.2}, '
+        b'"extraField": "should not be here", "anotherExtra": 123}'
+    )
+    assert data.unit_id == "test"
+    assert data.model_extra is None
+    assert "extraField" not in data.model_dump(by_alias=True)
+
+
+def test_malformed_json_input():
+    """
+    Request bodies are parsed straight from JSON by SENSOR_INPUT_ADAPTER, so
+    syntax and type errors surface as ValidationErrors without a round trip
+    through the API.
+    """
+    with pytest.raises(ValidationError) as exc_info:
+        SENSOR_INPUT_ADAPTER.validate_json(
+            b'{"unitId": "test", "timestamp": "2025-05-24T10:00:00Z", '
+            b'"readings": {"pH": 6.5, "temp": 22.1, "ec": }'
+        )
+    assert exc_info.value.errors()[0]["type"] == "json_invalid"
+
+    with pytest.raises(ValidationError) as exc_info:
+        SENSOR_INPUT_ADAPTER.validate_json(
+            b'{"unitId": "test", "timestamp": "2025-05-24T10:00:00Z", '
+            b'"readings": {"pH": "six point five", "temp": "warm", "ec": "low"}}'
+        )
+    assert {error["loc"] for error in exc_info.value.errors()} == {
+        ("readings", "pH"),
+        ("readings", "temp"),
+        ("readings", "ec"),
+    }
+
+    with pytest.raises(ValidationError) as exc_info:
+        SENSOR_INPUT_ADAPTER.validate_json(
+            b'{"unitId": "test", "timestamp": "2025-05-24T10:00:00Z", '
+            b'"readings": "not an object"}'
+        )
+    assert exc_info.value.errors()[0]["loc"] == ("readings",)
+
+    with pytest.raises(ValidationError) as exc_info:
+        SENSOR_INPUT_ADAPTER.validate_json(b'["unitId", "test"]')
+    assert exc_info.value.errors()[0]["type"] == "model_type"
@@ -1,4 +1,46 @@
+import json
+
 import pytest
+from httpx import ASGITransport, AsyncClient
+
+from app.api.routes import sensor
+from app.api.routes.sensor_core import classify_reading, store_reading
+from app.core.config import config
+from app.main import app
+from app.schemas import (
+    AlertsResponse,
+    SensorDataRecord,
+    SensorReadings,
+    UnitsResponse,
+)
+
+
+def sensor_payload(unit_id: str, timestamp: str, ph: float = 6.5) -> dict:
+    """
+    Body for POST /sensor where only the pH matters; temp and EC are healthy.
+    """
+    return {
+        "unitId": unit_id,
+        "timestamp": timestamp,
+        "readings": {"pH": ph, "temp": 22.1, "ec": 1.2},
+    }
+
+
+async def post_reading(client: AsyncClient, payload: dict) -> None:
+    """
+    Submit one reading and check it was accepted.
+    """
+    response = await client.post("/api/v1/sensor", json=payload)
+    assert response.status_code == 200
+
+
+async def get_alerts(client: AsyncClient, unit_id: str) -> dict:
+    """
+    Fetch a unit's alerts, check the request succeeded, and return the body.
+    """
+    response = await client.get("/api/v1/alerts", params={"unitId": unit_id})
+    assert response.status_code == 200
+    return response.json()
 
 
 @pytest.mark.asyncio
@@ -6,11 +48,7 @@ async def test_post_sensor_valid_data(client):
     # test healthy reading
     response = await client.post(
         "/api/v1/sensor",
-        json={
-            "unitId": "unit-123",
-            "timestamp": "2025-05-24T12:34:56Z",
-            "readings": {"pH": 6.5, "temp": 22.1, "ec": 1.2},
-        },
+        json=sensor_payload("unit-123", "2025-05-24T12:34:56Z", 6.5),
     )
     assert response.status_code == 200
     data = response.json()
@@ -20,11 +58,7 @@ async def test_post_sensor_valid_data(client):
     # Test needs attention reading
     response = await client.post(
         "/api/v1/sensor",
-        json={
-            "unitId": "unit-456",
-            "timestamp": "2025-05-24T12:35:56Z",
-            "readings": {"pH": 8.5, "temp": 22.1, "ec": 1.2},
-        },
+        json=sensor_payload("unit-456", "2025-05-24T12:35:56Z", 8.5),
     )
     assert response.status_code == 200
     data = response.json()
@@ -33,59 +67,152 @@ async def test_post_sensor_valid_data(client):
 
 
 @pytest.mark.asyncio
-async def test_post_sensor_invalid_readings(client):
-    # invalid pH
+@pytest.mark.parametrize(
+    ("readings", "invalid_field"),
+    [
+        ({"pH": 15.0, "temp": 22.1, "ec": 1.2}, "pH"),  # invalid pH
+        ({"pH": 6.5, "temp": -60, "ec": 1.2}, "temp"),  # invalid temperature
+        # temperature outside the physical limits of a hydroponic system
+        ({"pH": 6.5, "temp": 61, "ec": 1.2}, "temp"),
+        ({"pH": 6.5, "temp": 22.1, "ec": -1}, "ec"),  # invalid EC
+    ],
+)
+async def test_post_sensor_invalid_readings(client, readings, invalid_field):
     response = await client.post(
         "/api/v1/sensor",
         json={
             "unitId": "unit-123",
             "timestamp": "2025-05-24T12:34:56Z",
-            "readings": {"pH": 15.0, "temp": 22.1, "ec": 1.2},
+            "readings": readings,
         },
     )
     assert response.status_code == 422
+    assert [error["loc"] for error in response.json()["detail"]] == [
+        ["body", "readings", invalid_field]
+    ]
 
-    # invalid temperature
-    response = await client.post(
-        "/api/v1/sensor",
-        json={
-            "unitId": "unit-123",
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "payload",
+    [
+        # missing unitId
+        {
             "timestamp": "2025-05-24T12:34:56Z",
-            "readings": {"pH": 6.5, "temp": -60, "ec": 1.2},
+            "readings": {"pH": 6.5, "temp": 22.1, "ec": 1.2},
         },
-    )
+        # missing readings
+        {"unitId": "unit-123", "timestamp": "2025-05-24T12:34:56Z"},
+    ],
+)
+async def test_post_sensor_missing_fields(client, payload):
+    response = await client.post("/api/v1/sensor", json=payload)
     assert response.status_code == 422
 
-    # invalid EC
+
+@pytest.mark.asyncio
+async def test_post_sensor_naive_timestamp(client):
+    """
+    A timestamp without a UTC offset is rejected before anything is stored,
+    since it can't be ordered against the unit's other readings.
+    """
+    await post_reading(client, sensor_payload("unit-123", "2025-05-24T12:00:00Z"))
+
     response = await client.post(
         "/api/v1/sensor",
-        json={
-            "unitId": "unit-123",
-            "timestamp": "2025-05-24T12:34:56Z",
-            "readings": {"pH": 6.5, "temp": 22.1, "ec": -1},
-        },
+        json=sensor_payload("unit-123", "2025-05-24T12:30:00"),
     )
     assert response.status_code == 422
+    assert [error["loc"] for error in response.json()["detail"]] == [
+        ["body", "timestamp"]
+    ]
+
+    data = await get_alerts(client, "unit-123")
+    assert data["totalReadings"] == 1
 
 
 @pytest.mark.asyncio
-async def test_post_sensor_missing_fields(client):
-    # missing unitId
+async def test_post_sensor_batch(client):
     response = await client.post(
-        "/api/v1/sensor",
-        json={
-            "timestamp": "2025-05-24T12:34:56Z",
-            "readings": {"pH": 6.5, "temp": 22.1, "ec": 1.2},
-        },
+        "/api/v1/sensor/batch",
+        json=[
+            sensor_payload("unit-1", "2025-05-24T12:00:00Z", 6.5),
+            sensor_payload("unit-2", "2025-05-24T12:00:00Z", 8.5),
+            sensor_payload("unit-1", "2025-05-24T12:01:00Z", 4.0),
+        ],
     )
-    assert response.status_code == 422
+    assert response.status_code == 200
+    assert response.json() == {
+        "status": "OK",
+        "classifications": ["Healthy", "Needs Attention", "Needs Attention"],
+    }
+
+    data = await get_alerts(client, "unit-1")
+    assert data["totalReadings"] == 2
+    assert [alert["readings"]["pH"] for alert in data["alerts"]] == [4.0]
 
-    # missing readings
+
+@pytest.mark.asyncio
+async def test_post_sensor_batch_is_all_or_nothing(client):
+    """
+    A future timestamp anywhere in the batch rejects all of it, so nothing
+    is stored and the fixed batch can be resent as a whole.
+    """
     response = await client.post(
-        "/api/v1/sensor",
-        json={"unitId": "unit-123", "timestamp": "2025-05-24T12:34:56Z"},
+        "/api/v1/sensor/batch",
+        json=[
+            sensor_payload("unit-1", "2025-05-24T12:00:00Z", 6.5),
+            sensor_payload("unit-1", "2999-01-01T00:00:00Z", 6.5),
+        ],
+    )
+    assert response.status_code == 400
+    assert "Timestamp cannot be in the future" in response.json()["detail"]
+
+    response = await client.get("/api/v1/units")
+    assert response.json()["totalUnits"] == 0
+
+
+@pytest.mark.asyncio
+async def test_post_sensor_batch_with_naive_timestamp_stores_nothing(client):
+    """
+    Mixing timestamps with and without a UTC offset fails validation, so the
+    readings before the naive one aren't stored either.
+    """
+    response = await client.post(
+        "/api/v1/sensor/batch",
+        json=[
+            sensor_payload("unit-1", "2025-05-24T12:00:00Z", 6.5),
+            sensor_payload("unit-1", "2025-05-24T12:30:00", 8.5),
+        ],
     )
     assert response.status_code == 422
+    assert [error["loc"] for error in response.json()["detail"]] == [
+        ["body", 1, "timestamp"]
+    ]
+
+    response = await client.get("/api/v1/units")
+    assert response.json()["totalUnits"] == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("payload", "loc"),
+    [
+        ([], ["body"]),  # empty batch
+        ([sensor_payload("unit-1", "2025-05-24T12:00:00Z")] * 1001, ["body"]),
+        (
+            [
+                sensor_payload("unit-1", "2025-05-24T12:00:00Z"),
+                sensor_payload("unit-1", "2025-05-24T12:01:00Z", 15.0),
+            ],
+            ["body", 1, "readings", "pH"],
+        ),
+    ],
+)
+async def test_post_sensor_batch_invalid(client, payload, loc):
+    response = await client.post("/api/v1/sensor/batch", json=payload)
+    assert response.status_code == 422
+    assert [error["loc"] for error in response.json()["detail"]] == [loc]
 
 
 @pytest.mark.asyncio
@@ -97,20 +224,21 @@ async def test_get_alerts_with_data(client):
         {"pH": 6.0, "temp": 22.1, "ec": 1.2},  # Healthy
     ]
 
-    for i, readings in enumerate(readings_data):
-        await client.post(
-            "/api/v1/sensor",
-            json={
+    response = await client.post(
+        "/api/v1/sensor/batch",
+        json=[
+            {
                 "unitId": "unit-test",
                 "timestamp": f"2025-05-24T12:{i:02d}:00Z",
                 "readings": readings,
-            },
-        )
+            }
+            for i, readings in enumerate(readings_data)
+        ],
+    )
+    assert response.status_code == 200
 
     # get alerts
-    response = await client.get("/api/v1/alerts?unitId=unit-test")
-    assert response.status_code == 200
-    data = response.json()
+    data = await get_alerts(client, "unit-test")
 
     assert data["unitId"] == "unit-test"
     assert len(data["alerts"]) == 2  # Should have 2 "Needs Attention" readings
@@ -133,9 +261,7 @@ async def test_get_alerts_empty_unit(client):
     """
     unit with no data returns empty list.
     """
-    response = await client.get("/api/v1/alerts?unitId=nonexistent-unit")
-    assert response.status_code == 200
-    data = response.json()
+    data = await get_alerts(client, "nonexistent-unit")
     assert data["unitId"] == "nonexistent-unit"
     assert data["alerts"] == []
     assert not data["unitExists"]
@@ -167,11 +293,14 @@ async def test_get_units_overview(client):
         ),  # Needs Attention
     ]
 
-    for unit_id, timestamp, readings in test_data:
-        await client.post(
-            "/api/v1/sensor",
-            json={"unitId": unit_id, "timestamp": timestamp, "readings": readings},
-        )
+    response = await client.post(
+        "/api/v1/sensor/batch",
+        json=[
+            {"unitId": unit_id, "timestamp": timestamp, "readings": readings}
+            for unit_id, timestamp, readings in test_data
+        ],
+    )
+    assert response.status_code == 200
 
     # Get units overview
     response = await client.get("/api/v1/units")
@@ -181,20 +310,22 @@ async def test_get_units_overview(client):
     assert data["totalUnits"] == 3
     assert len(data["units"]) == 3
 
+    units = {u["unitId"]: u for u in data["units"]}
+
     # Check unit-1 details
-    unit1 = next(u for u in data["units"] if u["unitId"] == "unit-1")
+    unit1 = units["unit-1"]
     assert unit1["totalReadings"] == 2
     assert unit1["alertsCount"] == 1
     assert unit1["healthStatus"] == "warning"  # Has some alerts
 
     # Check unit-2 details
-    unit2 = next(u for u in data["units"] if u["unitId"] == "unit-2")
+    unit2 = units["unit-2"]
     assert unit2["totalReadings"] == 1
     assert unit2["alertsCount"] == 0
     assert unit2["healthStatus"] == "healthy"  # No alerts
 
     # Check unit-3 details
-    unit3 = next(u for u in data["units"] if u["unitId"] == "unit-3")
+    unit3 = units["unit-3"]
     assert unit3["totalReadings"] == 1
     assert unit3["alertsCount"] == 1
     assert unit3["healthStatus"] == "warning"  # 1 alert in last 10 readings
@@ -210,7 +341,7 @@ async def test_out_of_order_timestamps(client):
     chronological order due to network delays, buffering, or clock sync issues.
     We should accept and store them correctly, maintaining proper ordering.
     """
-    # send readings out of chronological order
+    # store readings out of chronological order
     readings_data = [
         ("2025-05-24T14:00:00Z", {"pH": 6.5, "temp": 22.1, "ec": 1.2}),  # Latest
         (
@@ -225,34 +356,84 @@ async def test_out_of_order_timestamps(client):
         # Second latest
     ]
 
-    # submit readings in non-chronological order
+    # seed the stores directly; the POST path with out-of-order readings is
+    # covered by test_alerts_keep_ten_most_recent
     for timestamp, readings in readings_data:
-        response = await client.post(
-            "/api/v1/sensor",
-            json={
-                "unitId": "unit-ooo-test",
-                "timestamp": timestamp,
-                "readings": readings,
-            },
+        sensor_readings = SensorReadings(**readings)
+        store_reading(
+            SensorDataRecord(
+                unitId="unit-ooo-test",
+                timestamp=timestamp,
+                readings=sensor_readings,
+                classification=classify_reading(sensor_readings),
+            )
         )
-        assert response.status_code == 200
 
     # get alerts - should be ordered by timestamp descending
-    response = await client.get("/api/v1/alerts?unitId=unit-ooo-test")
-    assert response.status_code == 200
-    data = response.json()
+    data = await get_alerts(client, "unit-ooo-test")
+
+    # should have 2 alerts (pH 8.5 and pH 4.0), returned in descending
+    # timestamp order
+    assert [
+        (alert["timestamp"], alert["readings"]["pH"]) for alert in data["alerts"]
+    ] == [
+        ("2025-05-24T12:00:00Z", 4.0),  # More recent alert first
+        ("2025-05-24T10:00:00Z", 8.5),  # Older alert second
+    ]
 
-    # should have 2 alerts (pH 8.5 and pH 4.0)
-    assert len(data["alerts"]) == 2
 
-    # Verify alerts are returned in descending timestamp order
-    timestamps = [alert["timestamp"] for alert in data["alerts"]]
-    assert timestamps[0] == "2025-05-24T12:00:00+00:00"  # More recent alert first
-    assert timestamps[1] == "2025-05-24T10:00:00+00:00"  # Older alert second
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("content_type", "status_code"),
+    [
+        ("application/json; charset=utf-8", 200),
+        ("application/vnd.hydrosense+json", 200),
+        # not JSON, and a browser may send it cross-origin without a preflight
+        ("text/plain", 422),
+        ("application/x-www-form-urlencoded", 422),
+        (None, 422),
+    ],
+)
+async def test_post_sensor_requires_json_content_type(
+    client, content_type, status_code
+):
+    headers = {"Content-Type": content_type} if content_type else {}
+    response = await client.post(
+        "/api/v1/sensor",
+        content=json.dumps(sensor_payload("unit-123", "2025-05-24T12:00:00Z")),
+        headers=headers,
+    )
+    assert response.status_code == status_code
 
-    # Verify the correct readings are flagged as alerts
-    assert data["alerts"][0]["readings"]["pH"] == 4.0
-    assert data["alerts"][1]["readings"]["pH"] == 8.5
+    data = await get_alerts(client, "unit-123")
+    assert data["totalReadings"] == (1 if status_code == 200 else 0)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("path", ["/api/v1/sensor", "/api/v1/sensor/batch"])
+@pytest.mark.parametrize(
+    ("encoding", "content_type"),
+    [
+        ("latin-1", "application/json"),
+        ("utf-16", "application/json; charset=utf-16"),
+        ("latin-1", "text/plain"),
+    ],
+)
+async def test_post_sensor_non_utf8_body(client, path, encoding, content_type):
+    """
+    A body that isn't UTF-8 is rejected with a 422 rather than crashing while
+    the error echoing it back is rendered.
+    """
+    payload = sensor_payload("ünït", "2025-05-24T12:00:00Z")
+    if path.endswith("/batch"):
+        payload = [payload]
+    response = await client.post(
+        path,
+        content=json.dumps(payload, ensure_ascii=False).encode(encoding),
+        headers={"Content-Type": content_type},
+    )
+    assert response.status_code == 422
+    assert [error["loc"] for error in response.json()["detail"]] == [["body"]]
 
 
 @pytest.mark.asyncio
@@ -290,20 +471,6 @@ async def test_malformed_json_payload(client):
     # should have validation errors for all three fields
     assert len(error_detail) >= 3
 
-    # extra fields that shouldn't exist
-    response = await client.post(
-        "/api/v1/sensor",
-        json={
-            "unitId": "test",
-            "timestamp": "2025-05-24T10:00:00Z",
-            "readings": {"pH": 6.5, "temp": 22.1, "ec": 1.2},
-            "extraField": "should not be here",
-            "anotherExtra": 123,
-        },
-    )
-    # Should still accept (Pydantic ignores extra fields by default)
-    assert response.status_code == 200
-
     # nested structure errors
     response = await client.post(
         "/api/v1/sensor",
@@ -325,3 +492,166 @@ async def test_malformed_json_payload(client):
         ],  # list instead of object
     )
     assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_alerts_keep_ten_most_recent(client):
+    """
+    Only the 10 most recent alerts by timestamp are returned, even when older
+    readings arrive after newer ones.
+    """
+    hours = [5, 0, 11, 3, 8, 1, 10, 6, 2, 9, 4, 7]  # 12 alerts, shuffled
+
+    for hour in hours:
+        await post_reading(
+            client,
+            sensor_payload("unit-cap-test", f"2025-05-24T{hour:02d}:00:00Z", 8.5),
+        )
+
+    data = await get_alerts(client, "unit-cap-test")
+
+    assert data["totalReadings"] == 12
+    timestamps = [alert["timestamp"] for alert in data["alerts"]]
+    assert timestamps == [f"2025-05-24T{hour:02d}:00:00Z" for hour in range(11, 1, -1)]
+
+
+@pytest.mark.asyncio
+async def test_alerts_body_matches_response_model(client):
+    """
+    The hand-assembled /alerts body is exactly what dumping AlertsResponse
+    would produce, including a unitId that needs JSON escaping.
+    """
+    unit_id = 'unit "quoted" \\ ünït'
+    for i, ph in enumerate([8.5, 6.5, 4.0]):
+        await post_reading(
+            client, sensor_payload(unit_id, f"2025-05-24T12:{i:02d}:00Z", ph)
+        )
+
+    response = await client.get("/api/v1/alerts", params={"unitId": unit_id})
+    assert response.status_code == 200
+
+    expected = AlertsResponse.model_validate(response.json())
+    assert response.content == expected.model_dump_json(by_alias=True).encode()
+    assert expected.unit_id == unit_id
+    assert [alert.readings.pH for alert in expected.alerts] == [4.0, 8.5]
+
+
+@pytest.mark.asyncio
+async def test_units_body_matches_response_model(client):
+    """
+    The cached per-unit fragments add up to exactly what dumping UnitsResponse
+    would produce, and a unit's fragment is refreshed by its next reading.
+    """
+    for unit_id, ph in [("unit-b", 6.5), ("unit-a", 8.5), ("unit-b", 4.0)]:
+        await post_reading(client, sensor_payload(unit_id, "2025-05-24T12:00:00Z", ph))
+        response = await client.get("/api/v1/units")
+        assert response.status_code == 200
+
+        expected = UnitsResponse.model_validate(response.json())
+        assert response.content == expected.model_dump_json(by_alias=True).encode()
+
+    units = {unit.unit_id: unit for unit in expected.units}
+    assert units["unit-b"].total_readings == 2
+    assert units["unit-b"].alerts_count == 1
+    assert units["unit-b"].health_status == "warning"
+
+
+@pytest.mark.asyncio
+async def test_units_health_uses_ten_most_recent_readings(client):
+    """
+    Health status only looks at the 10 most recent readings by timestamp, so a
+    late-arriving old alert doesn't change it.
+    """
+    # 4 alerts followed by 10 newer healthy readings
+    readings_data = [(hour, 8.5) for hour in range(4)] + [
+        (hour, 6.5) for hour in range(4, 14)
+    ]
+    # an old alert that arrives last
+    readings_data.append((0, 4.0))
+
+    for hour, ph in readings_data:
+        await post_reading(
+            client,
+            sensor_payload("unit-recent-test", f"2025-05-24T{hour:02d}:30:00Z", ph),
+        )
+
+    response = await client.get("/api/v1/units")
+    assert response.status_code == 200
+    unit = response.json()["units"][0]
+
+    assert unit["totalReadings"] == 15
+    assert unit["alertsCount"] == 5
+    assert unit["healthStatus"] == "healthy"
+    assert unit["lastReading"]["timestamp"] == "2025-05-24T13:30:00Z"
+
+
+@pytest.mark.asyncio
+async def test_units_ordered_by_health_then_unit_id(client):
+    """
+    Units are listed most urgent first, then alphabetically, and move between
+    groups as their recent readings change.
+    """
+    readings_data = [
+        ("unit-b", 6.5),  # healthy
+        ("unit-a", 6.5),  # healthy
+        ("unit-c", 8.5),  # warning
+    ] + [("unit-d", 4.0)] * 4  # critical after the 4th alert
+    readings_data.append(("unit-b", 8.5))  # unit-b moves to warning
+
+    for minute, (unit_id, ph) in enumerate(readings_data):
+        await post_reading(
+            client, sensor_payload(unit_id, f"2025-05-24T12:{minute:02d}:00Z", ph)
+        )
+
+    response = await client.get("/api/v1/units")
+    assert response.status_code == 200
+    units = response.json()["units"]
+
+    assert [(u["unitId"], u["healthStatus"]) for u in units] == [
+        ("unit-d", "critical"),
+        ("unit-b", "warning"),
+        ("unit-c", "warning"),
+        ("unit-a", "healthy"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_large_responses_are_gzipped(client):
+    for i in range(5):
+        response = await client.post(
+            "/api/v1/sensor",
+            json=sensor_payload(f"unit-{i}", "2025-05-24T12:00:00Z", 6.5),
+        )
+        assert response.status_code == 200
+        # tiny bodies are sent uncompressed
+        assert "content-encoding" not in response.headers
+
+    response = await client.get("/api/v1/units", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.json()["totalUnits"] == 5
+
+
+@pytest.mark.asyncio
+async def test_unexpected_error_returns_500(monkeypatch):
+    def fail(_record):
+        raise RuntimeError("store unavailable")
+
+    monkeypatch.setattr(sensor, "store_reading", fail)
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app, raise_app_exceptions=False),
+        base_url="http://test",
+    ) as client:
+        response = await client.post(
+            "/api/v1/sensor",
+            json=sensor_payload("unit-1", "2025-05-24T12:00:00Z", 6.5),
+            headers={"Origin": config.FRONTEND_HOST},
+        )
+
+    assert response.status_code == 500
+    assert response.json() == {
+        "detail": "An unexpected error occurred while processing the request"
+    }
+    # a cross-origin frontend can still read the error
+    assert response.headers["access-control-allow-origin"] == config.FRONTEND_HOST
@@ -0,0 +1,50 @@
+from collections import deque
+from datetime import UTC, datetime
+
+from app.api.routes.sensor_core import ReadingsBuffer, insert_by_timestamp
+from app.schemas import SensorDataRecord, SensorReadings
+
+
+def make_record(hour: int, ph: float) -> SensorDataRecord:
+    return SensorDataRecord(
+        unitId="unit-123",
+        timestamp=datetime(2025, 5, 24, hour, tzinfo=UTC),
+        readings=SensorReadings(pH=ph, temp=22.1, ec=1.2),
+        classification="Healthy" if 5.5 <= ph <= 7.0 else "Needs Attention",
+    )
+
+
+def test_readings_buffer_stores_columns():
+    buffer = ReadingsBuffer(capacity=3)
+    buffer.append(make_record(10, 6.5))
+    buffer.append(make_record(11, 8.5))
+
+    assert len(buffer) == 2
+    assert list(buffer.ph) == [6.5, 8.5]
+    assert list(buffer.temp) == [22.1, 22.1]
+    assert list(buffer.classifications) == [0, 1]
+    assert buffer.timestamps[0] == datetime(2025, 5, 24, 10, tzinfo=UTC).timestamp()
+
+
+def test_readings_buffer_overwrites_oldest_when_full():
+    buffer = ReadingsBuffer(capacity=3)
+    for hour, ph in enumerate([6.0, 6.1, 6.2, 6.3, 6.4]):
+        buffer.append(make_record(hour, ph))
+
+    assert len(buffer) == 3
+    # slots 0 and 1 were overwritten by the 4th and 5th readings
+    assert list(buffer.ph) == [6.3, 6.4, 6.2]
+    assert buffer.cursor == 2
+
+
+def test_insert_by_timestamp_stores_equal_timestamps_newest_first():
+    window: deque[SensorDataRecord] = deque(maxlen=3)
+    for ph in [6.0, 6.1, 6.2]:
+        insert_by_timestamp(window, make_record(10, ph))
+
+    # read backwards, equal timestamps come out in arrival order
+    assert [record.readings.pH for record in reversed(window)] == [6.0, 6.1, 6.2]
+
+    # a newer reading evicts the latest arrival among the oldest
+    insert_by_timestamp(window, make_record(11, 6.3))
+    assert [record.readings.pH for record in reversed(window)] == [6.3, 6.0, 6.1]